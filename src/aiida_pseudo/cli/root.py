@@ -1,6 +1,7 @@
 # -*- coding: utf-8 -*-
 """Command line interface `aiida-pseudo`."""
 from aiida.cmdline.params import options, types
+from aiida.manage.configuration import load_profile
 import click
 
 
@@ -40,7 +41,11 @@ class VerbosityGroup(click.Group):
 
 
 @click.group('aiida-pseudo', context_settings={'help_option_names': ['-h', '--help']})
-@options.PROFILE(type=types.ProfileParamType(load_profile=True), expose_value=False)
+@options.PROFILE(type=types.ProfileParamType())
 @options.VERBOSITY()
-def cmd_root():
+def cmd_root(profile):
     """CLI for the ``aiida-pseudo`` plugin."""
+    # The profile is only loaded here, once a subcommand is actually being invoked, instead of as soon as the option is
+    # parsed, which also happens for example when merely printing the help or during shell completion.
+    if profile is not None:
+        load_profile(profile.name)
@@ -1,5 +1,6 @@
 # -*- coding: utf-8 -*-
 """Module for data plugin to represent a pseudo potential in UPF format."""
+import math
 import pathlib
 import re
 import typing
@@ -11,9 +12,14 @@ __all__ = ('UpfData',)
 REGEX_ELEMENT_V1 = re.compile(r"""(?P<element>[a-zA-Z]{1,2})\s+Element""")
 REGEX_ELEMENT_V2 = re.compile(r"""\s*element\s*=\s*['"]\s*(?P<element>[a-zA-Z]{1,2})\s*['"].*""")
 
-PATTERN_FLOAT = r'[+-]?(\d+(\.\d*)?|\.\d+)([eE][+-]?\d+)?'
-REGEX_Z_VALENCE_V1 = re.compile(r"""(?P<z_valence>""" + PATTERN_FLOAT + r""")\s+Z valence""")
-REGEX_Z_VALENCE_V2 = re.compile(r"""\s*z_valence\s*=\s*['"]\s*(?P<z_valence>""" + PATTERN_FLOAT + r""")\s*['"].*""")
+TAG_Z_VALENCE_V1 = 'Z valence'
+TAG_Z_VALENCE_V2 = 'z_valence'
+
+# Opening tag of the section following the header, which marks the start of the bulk of the content of the file
+TAG_MESH = b'<PP_MESH'
+
+# Maximum number of characters around a tag that are inspected for its value, to avoid copying large parts of the file
+SCAN_WINDOW = 256
 
 
 def parse_element(content: str):
@@ -32,25 +38,82 @@ def parse_element(content: str):
     raise ValueError(f'could not parse the element from the UPF content: {content}')
 
 
+def scan_z_valence_v1(content: str) -> typing.Iterator[str]:
+    """Scan the content of a UPF v1 file for the Z valence, which precedes the ``Z valence`` tag on the same line.
+
+    :param content: the content of the UPF file.
+    :return: iterator over the string preceding each occurrence of the tag, in order of appearance.
+    """
+    index = content.find(TAG_Z_VALENCE_V1)
+
+    while index != -1:
+        head = content[max(0, index - SCAN_WINDOW):index]
+
+        if head[-1:].isspace():
+            tokens = head.split()
+            if tokens:
+                yield tokens[-1]
+
+        index = content.find(TAG_Z_VALENCE_V1, index + 1)
+
+
+def scan_z_valence_v2(content: str) -> typing.Iterator[str]:
+    """Scan the content of a UPF v2 file for the Z valence, which is defined by the quoted ``z_valence`` attribute.
+
+    :param content: the content of the UPF file.
+    :return: iterator over the quoted value of each occurrence of the attribute, in order of appearance.
+    """
+    index = content.find(TAG_Z_VALENCE_V2)
+
+    while index != -1:
+        start = index + len(TAG_Z_VALENCE_V2)
+        tail = content[start:start + SCAN_WINDOW].lstrip()
+
+        if tail[:1] == '=':
+            tail = tail[1:].lstrip()
+            if tail[:1] in ('"', "'"):
+                value, quote, _ = tail[1:].partition(tail[0])
+                if quote:
+                    yield value.strip()
+
+        index = content.find(TAG_Z_VALENCE_V2, start)
+
+
+def convert_float(value: str) -> typing.Optional[float]:
+    """Convert a string to a finite float.
+
+    :param value: the string to convert.
+    :return: the float or ``None`` if the string does not represent a finite number.
+    """
+    if '_' in value:
+        return None
+
+    try:
+        number = float(value)
+    except ValueError:
+        return None
+
+    return number if math.isfinite(number) else None
+
+
 def parse_z_valence(content: str) -> int:
     """Parse the content of the UPF file to determine the Z valence.
 
+    Occurrences of the tags whose value is not a number are skipped, since they can also appear in free text, for
+    example in the ``PP_INFO`` section that precedes the header.
+
     :param stream: a filelike object with the binary content of the file.
     :return: the Z valence.
     """
-    for regex in [REGEX_Z_VALENCE_V2, REGEX_Z_VALENCE_V1]:
-
-        match = regex.search(content)
+    for scan in [scan_z_valence_v2, scan_z_valence_v1]:
+        for token in scan(content):
 
-        if match:
-            z_valence = match.group('z_valence')
+            z_valence = convert_float(token)
 
-            try:
-                z_valence = float(z_valence)
-            except ValueError as exception:
-                raise ValueError(f'parsed value for the Z valence `{z_valence}` is not a valid number.') from exception
+            if z_valence is None:
+                continue
 
-            if int(z_valence) != z_valence:
+            if not z_valence.is_integer():
                 raise ValueError(f'parsed value for the Z valence `{z_valence}` is not an integer.')
 
             return int(z_valence)
@@ -58,11 +121,42 @@ def parse_z_valence(content: str) -> int:
     raise ValueError(f'could not parse the Z valence from the UPF content: {content}')
 
 
+def parse_header(content: bytes) -> typing.Tuple[str, int]:
+    """Parse the binary content of the UPF file to determine the element and the Z valence.
+
+    Both are defined in the header, which precedes the mesh and the rest of the numerical data that make up the bulk of
+    the file. Therefore only the content up to the mesh is decoded and parsed first. Only if that fails, for example
+    because the file does not contain a mesh section, is the full content decoded and parsed.
+
+    :param content: the binary content of the UPF file.
+    :return: tuple of the symbol of the element and the Z valence.
+    :raises ValueError: if the element or Z valence could not be parsed.
+    """
+    index = content.find(TAG_MESH)
+
+    if index != -1:
+        try:
+            header = content[:index].decode('utf-8')
+            return parse_element(header), parse_z_valence(header)
+        except ValueError:
+            pass
+
+    content = content.decode('utf-8')
+
+    return parse_element(content), parse_z_valence(content)
+
+
 class UpfData(PseudoPotentialData):
     """Data plugin to represent a pseudo potential in UPF format."""
 
     _key_z_valence = 'z_valence'
 
+    # Cache of the element and Z valence parsed from the header, indexed on the md5 checksum of the file content, such
+    # that the content of files that have already been parsed, for example when setting the same file again, does not
+    # have to be read and parsed again. The oldest entry is evicted when the maximum size is reached.
+    _header_cache: typing.Dict[str, typing.Tuple[str, int]] = {}
+    _header_cache_size = 128
+
     def set_file(self, source: typing.Union[str, pathlib.Path, typing.BinaryIO], filename: str = None, **kwargs):  # pylint: disable=arguments-differ
         """Set the file content and parse other optional attributes from the content.
 
@@ -84,10 +178,30 @@ class UpfData(PseudoPotentialData):
         """
         source = self.prepare_source(source)
         super().set_file(source, filename, **kwargs)
+        self.element, self.z_valence = self._get_header(source)
+
+    def _get_header(self, source: typing.BinaryIO) -> typing.Tuple[str, int]:
+        """Return the element and Z valence of the current file, parsing the ``source`` only if not already cached.
+
+        :param source: binary stream of the current file content.
+        :return: tuple of the symbol of the element and the Z valence.
+        """
+        cache = self._header_cache
+
+        try:
+            return cache[self.md5]
+        except KeyError:
+            pass
+
         source.seek(0)
-        content = source.read().decode('utf-8')
-        self.element = parse_element(content)
-        self.z_valence = parse_z_valence(content)
+        header = parse_header(source.read())
+
+        if len(cache) >= self._header_cache_size:
+            cache.pop(next(iter(cache)))
+
+        cache[self.md5] = header
+
+        return header
 
     @property
     def z_valence(self) -> typing.Optional[int]:
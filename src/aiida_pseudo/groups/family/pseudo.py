@@ -1,5 +1,10 @@
 # -*- coding: utf-8 -*-
 """Subclass of ``Group`` that serves as a base class for representing pseudo potential families."""
+import collections
+from concurrent.futures import ThreadPoolExecutor
+import io
+import os
+import pathlib
 import re
 from typing import List, Mapping, Tuple, Union
 
@@ -14,6 +19,8 @@ __all__ = ('PseudoPotentialFamily',)
 
 StructureData = DataFactory('core.structure')
 
+REGEX_ELEMENT_FILENAME = re.compile(r'^([A-Za-z]{1,2})\.\w+')
+
 
 class PseudoPotentialFamily(Group):
     """Group to represent a pseudo potential family.
@@ -26,7 +33,9 @@ class PseudoPotentialFamily(Group):
 
     _key_pseudo_type = '_pseudo_type'
     _pseudo_types = (PseudoPotentialData,)
+    _pseudo_types_valid = True
     _pseudos = None
+    _pseudos_complete = False
 
     def __repr__(self):
         """Represent the instance for debugging purposes."""
@@ -36,11 +45,21 @@ class PseudoPotentialFamily(Group):
         """Represent the instance for human-readable purposes."""
         return f'{self.__class__.__name__}<{self.label}>'
 
+    def __init_subclass__(cls, **kwargs):
+        """Validate that the ``_pseudo_types`` class attribute is a tuple of ``PseudoPotentialData`` subclasses.
+
+        The validation only depends on the class, so it is performed once when the subclass is defined instead of for
+        each instance. The result is stored in ``_pseudo_types_valid``, such that the constructor can raise.
+        """
+        super().__init_subclass__(**kwargs)
+        cls._pseudo_types_valid = bool(cls._pseudo_types) and isinstance(cls._pseudo_types, tuple) and all(
+            isinstance(pseudo_type, type) and issubclass(pseudo_type, PseudoPotentialData)
+            for pseudo_type in cls._pseudo_types
+        )
+
     def __init__(self, *args, **kwargs):
-        """Validate that the ``_pseudo_types`` class attribute is a tuple of ``PseudoPotentialData`` subclasses."""
-        if not self._pseudo_types or not isinstance(self._pseudo_types, tuple) or any(
-            not issubclass(pseudo_type, PseudoPotentialData) for pseudo_type in self._pseudo_types
-        ):
+        """Raise if the ``_pseudo_types`` class attribute was found to be invalid when the class was defined."""
+        if not self._pseudo_types_valid:
             raise RuntimeError('`_pseudo_types` should be a tuple of `PseudoPotentialData` subclasses.')
 
         super().__init__(*args, **kwargs)
@@ -79,13 +98,48 @@ class PseudoPotentialFamily(Group):
         if not dirpath.is_dir():
             raise ValueError(f'`{dirpath}` is not a directory')
 
-        dirpath_contents = list(dirpath.iterdir())
+        with os.scandir(dirpath) as iterator:
+            dirpath_contents = list(iterator)
 
-        if len(dirpath_contents) == 1 and (dirpath / dirpath_contents[0]).is_dir():
-            dirpath = dirpath_contents[0]
+        if len(dirpath_contents) == 1 and dirpath_contents[0].is_dir():
+            dirpath = pathlib.Path(dirpath_contents[0].path)
 
         return dirpath
 
+    @staticmethod
+    def _read_files(filepaths, max_in_flight=8):
+        """Return an iterator over the binary content of each of the given files, in the same order as ``filepaths``.
+
+        For larger numbers of files the files are read concurrently in a pool of threads, since reading releases the GIL
+        and the reads can therefore overlap. The number of reads that are submitted ahead of the content that has been
+        consumed is limited by ``max_in_flight``, such that at most that many files are held in memory at any time. For
+        small numbers of files this is not worth the overhead of the pool.
+
+        :param filepaths: list of filepaths to read.
+        :param max_in_flight: maximum number of files that are read ahead of the consumer.
+        :return: iterator over the binary content of each file in the same order as ``filepaths``.
+        """
+
+        def read_file(filepath):
+            with open(filepath, 'rb') as handle:
+                return handle.read()
+
+        if len(filepaths) <= max_in_flight:
+            for filepath in filepaths:
+                yield read_file(filepath)
+            return
+
+        futures = collections.deque()
+
+        with ThreadPoolExecutor(max_workers=max_in_flight) as executor:
+            for filepath in filepaths:
+                futures.append(executor.submit(read_file, filepath))
+                if len(futures) >= max_in_flight:
+                    yield futures.popleft().result()
+
+            while futures:
+                yield futures.popleft().result()
+
     @classmethod
     def parse_pseudos_from_directory(cls, dirpath, pseudo_type=None, deduplicate=True):
         """Parse the pseudo potential files in the given directory into a list of data nodes.
@@ -110,18 +164,28 @@ class PseudoPotentialFamily(Group):
         """
         from aiida.common.exceptions import ParsingError
 
-        pseudos = []
+        pseudos = {}
         dirpath = cls._validate_dirpath(dirpath)
         pseudo_type = cls._validate_pseudo_type(pseudo_type)
 
-        for filepath in dirpath.iterdir():
+        # Use ``os.scandir`` since its entries cache the file type information, saving a ``stat`` call per entry
+        with os.scandir(dirpath) as iterator:
+            entries = list(iterator)
 
-            filename = filepath.name
+        for entry in entries:
+            if not entry.is_file():
+                raise ValueError(f'dirpath `{dirpath}` contains at least one entry that is not a file: {entry.path}')
 
-            if not filepath.is_file():
-                raise ValueError(f'dirpath `{dirpath}` contains at least one entry that is not a file: {filepath}')
+        # Only the reading of the files is done concurrently: constructing the nodes and querying for duplicates goes
+        # through the storage backend and therefore remains serial. Each file is parsed as soon as its content is read.
+        contents = cls._read_files([entry.path for entry in entries])
 
-            with open(filepath, 'rb') as handle:
+        for entry, content in zip(entries, contents):
+
+            filepath = entry.path
+            filename = entry.name
+
+            with io.BytesIO(content) as handle:
                 try:
                     if deduplicate:
                         pseudo = pseudo_type.get_or_create(handle, filename=filename)
@@ -131,7 +195,7 @@ class PseudoPotentialFamily(Group):
                     raise ParsingError(f'failed to parse `{filepath}`: {exception}') from exception
 
             if pseudo.element is None:
-                match = re.search(r'^([A-Za-z]{1,2})\.\w+', filename)
+                match = REGEX_ELEMENT_FILENAME.search(filename)
                 if match is None:
                     raise ParsingError(
                         f'`{pseudo.__class__}` constructor did not define the element and could not parse a valid '
@@ -139,17 +203,17 @@ class PseudoPotentialFamily(Group):
                         '`ELEMENT.EXTENSION`'
                     )
                 pseudo.element = match.group(1)
-            pseudos.append(pseudo)
 
-        if not pseudos:
-            raise ValueError(f'no pseudo potentials were parsed from `{dirpath}`')
+            # Fail as soon as a duplicate is encountered, such that the remaining files don't have to be parsed
+            if pseudo.element in pseudos:
+                raise ValueError(f'directory `{dirpath}` contains pseudo potentials with duplicate elements')
 
-        elements = set(pseudo.element for pseudo in pseudos)
+            pseudos[pseudo.element] = pseudo
 
-        if len(pseudos) != len(elements):
-            raise ValueError(f'directory `{dirpath}` contains pseudo potentials with duplicate elements')
+        if not pseudos:
+            raise ValueError(f'no pseudo potentials were parsed from `{dirpath}`')
 
-        return pseudos
+        return list(pseudos.values())
 
     @classmethod
     def create_from_folder(cls, dirpath, label, *, description='', pseudo_type=None, deduplicate=True):
@@ -179,9 +243,12 @@ class PseudoPotentialFamily(Group):
         pseudos = cls.parse_pseudos_from_directory(dirpath, pseudo_type, deduplicate=deduplicate)
 
         # Only store the ``Group`` and the pseudo nodes now, such that we don't have to worry about the clean up in the
-        # case that an exception is raised during creating them.
-        family.store()
-        family.add_nodes([pseudo.store() for pseudo in pseudos])
+        # case that an exception is raised during creating them. Doing so within a single transaction means the database
+        # is committed once for the entire family, instead of once for each node, and nothing is left behind if any of
+        # the nodes fails to be stored.
+        with family.backend.transaction():
+            family.store()
+            family.add_nodes([pseudo.store() for pseudo in pseudos])
 
         return family
 
@@ -226,17 +293,39 @@ class PseudoPotentialFamily(Group):
             raise TypeError(f'only nodes of types `{self._pseudo_types}` can be added: {nodes}')
 
         pseudos = {}
+        existing = self.pseudos
 
-        # Check for duplicates before adding any pseudo to the internal cache
+        # Check for duplicates before adding any pseudo to the internal cache. The lookup is done directly on the cache,
+        # which is indexed on the element, instead of through ``elements``, which would construct a new list each time.
         for pseudo in nodes:
-            if pseudo.element in self.elements:
+            if pseudo.element in existing:
                 raise ValueError(f'element `{pseudo.element}` already present in this family')
+            if pseudo.element in pseudos and pseudos[pseudo.element].pk != pseudo.pk:
+                raise ValueError(f'nodes contain multiple pseudos for element `{pseudo.element}`')
             pseudos[pseudo.element] = pseudo
 
+        # Add the nodes before updating the internal cache, such that it remains consistent if this raises.
+        super().add_nodes(nodes)
+
         self.pseudos.update(pseudos)
         self.update_pseudo_type()
 
-        super().add_nodes(nodes)
+    def count(self):
+        """Return the number of pseudopotentials in the family.
+
+        .. note:: since the family contains exactly one pseudopotential per element, the count is taken from the
+            internal cache if this instance has loaded all the nodes of the family into it, instead of querying the
+            database.
+
+        .. warning:: the cache is only updated by this instance, so if another instance of the same family adds or
+            removes nodes, the returned value will be stale. Load the family again to get the current count.
+
+        :return: the number of pseudopotentials in the family.
+        """
+        if self._pseudos is not None and self._pseudos_complete:
+            return len(self._pseudos)
+
+        return super().count()
 
     def remove_nodes(self, nodes):
         """Remove a pseudopotential or a set of pseudopotentials from the family.
@@ -256,6 +345,7 @@ class PseudoPotentialFamily(Group):
         """Remove all the pseudopotentials from this family."""
         super().clear()
         self._pseudos = None
+        self._pseudos_complete = False
         self.update_pseudo_type()
 
     @property
@@ -266,6 +356,7 @@ class PseudoPotentialFamily(Group):
         """
         if self._pseudos is None:
             self._pseudos = {pseudo.element: pseudo for pseudo in self.nodes}
+            self._pseudos_complete = True
 
         return self._pseudos
 
@@ -273,9 +364,19 @@ class PseudoPotentialFamily(Group):
     def elements(self):
         """Return the list of elements for which this family defines a pseudo potential.
 
+        .. note:: if the pseudo potentials have not yet been loaded into the internal cache, the elements are projected
+            directly by the database, such that the nodes themselves don't have to be loaded.
+
         :return: list of element symbols
         """
-        return list(self.pseudos.keys())
+        if self._pseudos is not None or not self.is_stored:
+            return list(self.pseudos.keys())
+
+        builder = QueryBuilder()
+        builder.append(self.__class__, filters={'id': self.pk}, tag='group')
+        builder.append(self._pseudo_types, with_group='group', project='attributes.element')
+
+        return builder.distinct().all(flat=True)
 
     def get_pseudo(self, element):
         """Return the pseudo potential for the given element.
@@ -300,7 +401,9 @@ class PseudoPotentialFamily(Group):
                     f'family `{self.label}` does not contain pseudo for element `{element}`'
                 ) from exception
             else:
+                # The pseudo was added to the family after the cache was loaded, so it no longer reflects all the nodes
                 self.pseudos[element] = pseudo
+                self._pseudos_complete = False
 
         return pseudo
 
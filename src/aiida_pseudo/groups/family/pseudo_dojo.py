@@ -2,7 +2,6 @@
 """Subclass of `PseudoPotentialFamily` designed to represent a PseudoDojo configuration."""
 import json
 import pathlib
-import re
 from typing import NamedTuple, Sequence
 import warnings
 
@@ -11,7 +10,7 @@ from aiida.common.exceptions import ParsingError
 from aiida_pseudo.data.pseudo import JthXmlData, PsmlData, Psp8Data, UpfData
 
 from ..mixins import RecommendedCutoffMixin
-from .pseudo import PseudoPotentialFamily
+from .pseudo import REGEX_ELEMENT_FILENAME, PseudoPotentialFamily
 
 __all__ = ('PseudoDojoConfiguration', 'PseudoDojoFamily')
 
@@ -284,7 +283,7 @@ class PseudoDojoFamily(RecommendedCutoffMixin, PseudoPotentialFamily):
             except ParsingError as exception:
                 raise ParsingError(f'failed to parse `{filepath}`: {exception}') from exception
             else:
-                match = re.search(r'^([A-Za-z]{1,2})\.\w+', filename)
+                match = REGEX_ELEMENT_FILENAME.search(filename)
                 if match is None:
                     raise ParsingError(
                         f'could not parse a valid element symbol from the filename `{filename}`. '
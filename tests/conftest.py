@@ -14,12 +14,24 @@ import pytest
 from aiida_pseudo.data.pseudo import PseudoPotentialData
 from aiida_pseudo.groups.family import CutoffsPseudoPotentialFamily, PseudoPotentialFamily
 
+from .utils import link_or_copy
+
 pytest_plugins = ['aiida.manage.tests.pytest_fixtures']  # pylint: disable=invalid-name
 
 
 @pytest.fixture
-def clear_db(aiida_profile_clean):
-    """Alias for the `aiida_profile_clean` fixture from `aiida-core`."""
+def clear_db(request, aiida_profile):
+    """Reset the storage of the test profile through the `aiida_profile_clean` fixture from `aiida-core` if necessary.
+
+    Resetting the storage is relatively expensive, whereas checking whether it contains any nodes or groups, the only
+    entities that are created by the tests, takes two cheap queries. Many tests don't store anything, in which case the
+    reset is skipped.
+    """
+    from aiida.orm import Group, Node, QueryBuilder
+
+    if QueryBuilder().append(Node).count() or QueryBuilder().append(Group).count():
+        request.getfixturevalue('aiida_profile_clean')
+
     yield
 
 
@@ -76,6 +88,17 @@ def run_cli_command():
 
 
 @pytest.fixture
+def copy_tree():
+    """Return a function that copies a directory tree, hard linking the files instead of copying them if possible."""
+
+    def _copy_tree(source, destination) -> pathlib.Path:
+        """Copy the directory ``source`` to ``destination``, which is allowed to already exist."""
+        return shutil.copytree(source, destination, dirs_exist_ok=True, copy_function=link_or_copy)
+
+    return _copy_tree
+
+
+@pytest.fixture(scope='session')
 def filepath_fixtures() -> pathlib.Path:
     """Return the absolute filepath to the directory containing the file `fixtures`.
 
@@ -84,7 +107,7 @@ def filepath_fixtures() -> pathlib.Path:
     return pathlib.Path(__file__).parent.resolve() / 'fixtures'
 
 
-@pytest.fixture
+@pytest.fixture(scope='session')
 def filepath_pseudos(filepath_fixtures):
     """Return the absolute filepath to the directory containing the pseudo potential files.
 
@@ -128,6 +151,23 @@ def get_pseudo_potential_data(filepath_pseudos):
     return _get_pseudo_potential_data
 
 
+@pytest.fixture
+def store_all():
+    """Return a function that stores the given nodes within a single transaction."""
+
+    def _store_all(*nodes):
+        """Store the given nodes committing the transaction only once.
+
+        :return: tuple of the stored nodes.
+        """
+        from aiida.manage import get_manager
+
+        with get_manager().get_profile_storage().transaction():
+            return tuple(node.store() for node in nodes)
+
+    return _store_all
+
+
 @pytest.fixture
 def generate_cutoffs():
     """Return a dictionary of cutoffs for all elements in a given family."""
@@ -194,7 +234,7 @@ def get_pseudo_family(tmp_path, filepath_pseudos):
 
         for pseudo in dirpath.iterdir():
             if elements is None or any(pseudo.name.startswith(element) for element in elements):
-                shutil.copyfile(pseudo, tmp_path / pseudo.name)
+                link_or_copy(pseudo, tmp_path / pseudo.name)
 
         family = cls.create_from_folder(tmp_path, label, pseudo_type=pseudo_type)
 
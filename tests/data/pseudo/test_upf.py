@@ -8,11 +8,17 @@ from aiida.common.exceptions import ModificationNotAllowed
 import pytest
 
 from aiida_pseudo.data.pseudo import UpfData
-from aiida_pseudo.data.pseudo.upf import parse_z_valence
+from aiida_pseudo.data.pseudo.upf import parse_header, parse_z_valence
+
+
+@pytest.fixture(scope='session')
+def upf_contents(filepath_pseudos):
+    """Return the binary content of the UPF test files indexed on their filename, reading them only once per session."""
+    return {filepath.name: filepath.read_bytes() for filepath in filepath_pseudos(entry_point='upf').iterdir()}
 
 
 @pytest.fixture
-def source(request, filepath_pseudos):
+def source(request, filepath_pseudos, upf_contents):
     """Return a pseudopotential, eiter as ``str``, ``Path`` or ``io.BytesIO``."""
     filepath_pseudo = filepath_pseudos(entry_point='upf') / 'Ar.upf'
 
@@ -22,7 +28,8 @@ def source(request, filepath_pseudos):
     if request.param is pathlib.Path:
         return filepath_pseudo
 
-    return io.BytesIO(filepath_pseudo.read_bytes())
+    # The buffer shares the cached ``bytes`` object instead of copying it, as long as nothing is written to the stream
+    return io.BytesIO(upf_contents[filepath_pseudo.name])
 
 
 @pytest.mark.parametrize('source', (io.BytesIO, str, pathlib.Path), indirect=True)
@@ -75,8 +82,60 @@ def test_set_file(filepath_pseudos, get_pseudo_potential_data):
         'z_valence="    1"',
         'z_valence="1    "',
         '1.0     Z valence',
+        'The Z valence is below\n 4.00 Z valence',
+        '<PP_INFO>\n  Z valence from the reference configuration\n</PP_INFO>\n  4.00   Z valence',
+        'z_valence="x"\n 4.0 Z valence',
     )
 )
 def test_parse_z_valence(content):
     """Test the ``parse_z_valence`` method."""
     assert parse_z_valence(content)
+
+
+@pytest.mark.parametrize(
+    'content, message', (
+        ('z_valence="1.5"', r'parsed value for the Z valence `.*` is not an integer.'),
+        ('z_valence="one"', r'could not parse the Z valence from the UPF content: .*'),
+        ('z_valence="inf"', r'could not parse the Z valence from the UPF content: .*'),
+        ('z_valence=', r'could not parse the Z valence from the UPF content: .*'),
+        ('Z valence', r'could not parse the Z valence from the UPF content: .*'),
+    )
+)
+def test_parse_z_valence_invalid(content, message):
+    """Test the ``parse_z_valence`` method for invalid content."""
+    with pytest.raises(ValueError, match=message):
+        parse_z_valence(content)
+
+
+@pytest.mark.parametrize(
+    'content', (
+        b'<PP_HEADER element="Ar" z_valence="8.0" />\n<PP_MESH>\n</PP_MESH>',
+        b'<PP_HEADER element="Ar" z_valence="8.0" />',
+        b'<PP_INFO>\n</PP_INFO>\n<PP_MESH>\n</PP_MESH>\n<PP_HEADER element="Ar" z_valence="8.0" />',
+    )
+)
+def test_parse_header(content):
+    """Test the ``parse_header`` method with and without the header preceding the mesh section."""
+    assert parse_header(content) == ('Ar', 8)
+
+
+def test_set_file_cached(filepath_pseudos, monkeypatch):
+    """Test that `UpfData.set_file` does not parse the content again for a file whose content has been parsed before."""
+    from aiida_pseudo.data.pseudo import upf
+
+    calls = []
+    parse_header = upf.parse_header
+
+    def parse_header_counted(content):
+        calls.append(content)
+        return parse_header(content)
+
+    monkeypatch.setattr(UpfData, '_header_cache', {})
+    monkeypatch.setattr(upf, 'parse_header', parse_header_counted)
+
+    for _ in range(2):
+        pseudo = UpfData(filepath_pseudos('upf') / 'He.upf')
+        assert pseudo.element == 'He'
+        assert pseudo.z_valence == 1
+
+    assert len(calls) == 1
@@ -1,10 +1,8 @@
 # -*- coding: utf-8 -*-
 # pylint: disable=redefined-outer-name
 """Tests for the `PseudoPotentialFamily` class."""
-import shutil
-
 from aiida.common import exceptions
-from aiida.orm import QueryBuilder
+from aiida.orm import QueryBuilder, load_group
 import pytest
 
 from aiida_pseudo.data.pseudo import PseudoPotentialData
@@ -85,9 +83,9 @@ def test_create_from_folder(filepath_pseudos):
 
 
 @pytest.mark.usefixtures('clear_db')
-def test_create_from_folder_nested(filepath_pseudos, tmp_path):
+def test_create_from_folder_nested(filepath_pseudos, tmp_path, copy_tree):
     """Test the `PseudoPotentialFamily.create_from_folder` class method when the pseudos are in a subfolder."""
-    shutil.copytree(filepath_pseudos(), tmp_path / 'subdirectory')
+    copy_tree(filepath_pseudos(), tmp_path / 'subdirectory')
 
     label = 'label'
     family = PseudoPotentialFamily.create_from_folder(tmp_path, label)
@@ -148,10 +146,10 @@ def test_create_from_folder_empty(tmp_path):
 
 
 @pytest.mark.usefixtures('clear_db')
-def test_create_from_folder_duplicate_element(tmp_path, filepath_pseudos):
+def test_create_from_folder_duplicate_element(tmp_path, filepath_pseudos, copy_tree):
     """Test the `PseudoPotentialFamily.create_from_folder` class method for folder containing duplicate element."""
     dirpath = tmp_path / 'pseudos'
-    shutil.copytree(filepath_pseudos(), dirpath)
+    copy_tree(filepath_pseudos(), dirpath)
 
     (dirpath / 'Ar.UPF').touch()
 
@@ -159,6 +157,28 @@ def test_create_from_folder_duplicate_element(tmp_path, filepath_pseudos):
         PseudoPotentialFamily.create_from_folder(dirpath, 'label')
 
 
+@pytest.mark.usefixtures('clear_db')
+def test_create_from_folder_store_fail(filepath_pseudos, monkeypatch):
+    """Test that `PseudoPotentialFamily.create_from_folder` does not leave anything behind if storing fails."""
+    store = PseudoPotentialData.store
+    calls = []
+
+    def store_fail(self, **kwargs):
+        """Store the first pseudo normally but raise for the second one."""
+        calls.append(self)
+        if len(calls) > 1:
+            raise exceptions.StoringNotAllowed('failure')
+        return store(self, **kwargs)
+
+    monkeypatch.setattr(PseudoPotentialData, 'store', store_fail)
+
+    with pytest.raises(exceptions.StoringNotAllowed):
+        PseudoPotentialFamily.create_from_folder(filepath_pseudos(), 'label')
+
+    assert QueryBuilder().append(PseudoPotentialFamily).count() == 0
+    assert QueryBuilder().append(PseudoPotentialData).count() == 0
+
+
 @pytest.mark.usefixtures('clear_db')
 def test_create_from_folder_duplicate(filepath_pseudos):
     """Test that `PseudoPotentialFamily.create_from_folder` raises for duplicate label."""
@@ -188,13 +208,28 @@ def test_parse_pseudos_from_directory_non_file_nested(tmp_path):
     Note that a subdirectory containing the pseudos is fine, but if we find a directory and any other object at the
     base path, it should raise.
     """
-    (tmp_path / 'pseudos' / 'directory').mkdir(parents=True)
-    (tmp_path / 'pseudos' / 'Ar.upf').touch()
+    dirpath = tmp_path / 'pseudos'
+    (dirpath / 'directory').mkdir(parents=True)
+    (dirpath / 'Ar.upf').touch()
 
     with pytest.raises(ValueError, match=r'dirpath `.*` contains at least one entry that is not a file'):
         PseudoPotentialFamily.parse_pseudos_from_directory(tmp_path)
 
 
+@pytest.mark.parametrize('count', (1, 20))
+def test_read_files(tmp_path, count):
+    """Test the `PseudoPotentialFamily._read_files` method returns the content in the order of the filepaths."""
+    filepaths = []
+
+    for index in range(count):
+        filepath = tmp_path / f'file_{index}'
+        filepath.write_bytes(str(index).encode('utf-8'))
+        filepaths.append(filepath)
+
+    contents = PseudoPotentialFamily._read_files(filepaths)  # pylint: disable=protected-access
+    assert list(contents) == [str(index).encode('utf-8') for index in range(count)]
+
+
 @pytest.mark.filterwarnings('ignore:no registered entry point for `SomeFamily` so its instances will not be storable.')
 def test_parse_pseudos_from_directory_incorrect_pseudo_type(tmp_path):
     """Test the `PseudoPotentialFamily.parse_pseudos_from_directory` for invalid ``pseudo_type`` arguments.
@@ -217,7 +252,7 @@ def test_parse_pseudos_from_directory_incorrect_pseudo_type(tmp_path):
 
 
 @pytest.mark.usefixtures('clear_db')
-def test_add_nodes(get_pseudo_family, get_pseudo_potential_data):
+def test_add_nodes(get_pseudo_family, get_pseudo_potential_data, store_all):
     """Test that `PseudoPotentialFamily.add_nodes` method."""
     family = get_pseudo_family(elements=('Rn',))
     assert family.count() == 1
@@ -230,7 +265,7 @@ def test_add_nodes(get_pseudo_family, get_pseudo_potential_data):
     family.add_nodes(pseudos)
     assert family.count() == 3
 
-    pseudos = (get_pseudo_potential_data('He').store(), get_pseudo_potential_data('Kr').store())
+    pseudos = store_all(get_pseudo_potential_data('He'), get_pseudo_potential_data('Kr'))
     family.add_nodes(pseudos)
     assert family.count() == 5
 
@@ -263,6 +298,7 @@ def test_add_nodes_unstored(get_pseudo_family, nodes_unstored):
         family.add_nodes(nodes_unstored)
 
     assert family.count() == count
+    assert load_group(family.pk).count() == count
 
 
 @pytest.fixture
@@ -306,6 +342,37 @@ def test_add_nodes_duplicate_element(get_pseudo_family, get_pseudo_potential_dat
         family.add_nodes(pseudo)
 
 
+@pytest.mark.usefixtures('clear_db')
+def test_add_nodes_duplicate_element_nodes(get_pseudo_family, get_pseudo_potential_data):
+    """Test that `PseudoPotentialFamily.add_nodes` fails if the nodes contain multiple pseudos for the same element."""
+    family = get_pseudo_family(elements=('He',))
+    pseudos = [get_pseudo_potential_data('Ar').store(), get_pseudo_potential_data('Ar').store()]
+
+    with pytest.raises(ValueError, match='nodes contain multiple pseudos for element `Ar`'):
+        family.add_nodes(pseudos)
+
+    assert family.count() == 1
+    assert load_group(family.pk).count() == 1
+
+
+@pytest.mark.usefixtures('clear_db')
+def test_count(get_pseudo_family, get_pseudo_potential_data):
+    """Test the ``PseudoPotentialFamily.count`` method with and without the pseudos loaded in the internal cache."""
+    elements = ('Ar', 'He', 'Kr')
+    family = get_pseudo_family(elements=elements)
+    assert family.count() == len(elements)
+
+    family = load_group(family.pk)
+    assert family.count() == len(elements)
+    assert family._pseudos is None  # pylint: disable=protected-access
+
+    # Add pseudos through another instance: once ``get_pseudo`` finds one outside the cache, the database is queried
+    assert sorted(family.pseudos) == sorted(elements)
+    load_group(family.pk).add_nodes([get_pseudo_potential_data(element).store() for element in ('Ne', 'Rn')])
+    family.get_pseudo('Ne')
+    assert family.count() == len(elements) + 2
+
+
 @pytest.mark.usefixtures('clear_db')
 def test_remove_nodes(get_pseudo_family):
     """Test the ``PseudoPotentialFamily.remove_nodes`` method."""
@@ -379,6 +446,11 @@ def test_elements(get_pseudo_family):
     family = get_pseudo_family(elements=elements)
     assert sorted(family.elements) == elements
 
+    # Reload the family so the pseudos are not yet loaded in the internal cache and the elements are queried for
+    family = load_group(family.pk)
+    assert sorted(family.elements) == elements
+    assert family._pseudos is None  # pylint: disable=protected-access
+
     family = PseudoPotentialFamily(label='empty').store()
     assert family.elements == []
 
@@ -0,0 +1,25 @@
+# -*- coding: utf-8 -*-
+"""Tests for the ``tests.utils`` module."""
+from .utils import link_or_copy
+
+
+def test_link_or_copy(tmp_path):
+    """Test ``link_or_copy`` on a single filesystem, where it creates a hard link, and that it can be called again.
+
+    In CI the temporary directories live on a separate ``tmpfs`` from the fixtures, so the fixtures only ever exercise
+    the copy fallback. Here both paths are in ``tmp_path`` so the hard link path is exercised.
+    """
+    source = tmp_path / 'source'
+    source.write_bytes(b'content')
+
+    destination = tmp_path / 'destination'
+
+    for _ in range(2):
+        link_or_copy(source, destination)
+        assert destination.samefile(source)
+
+    destination.unlink()
+    destination.write_bytes(b'other')
+    link_or_copy(source, destination)
+    assert destination.samefile(source)
+    assert destination.read_bytes() == b'content'
@@ -0,0 +1,31 @@
+# -*- coding: utf-8 -*-
+"""Utilities for the unit test suite."""
+import errno
+import os
+import pathlib
+import shutil
+
+
+def link_or_copy(source, destination):
+    """Create a hard link to ``source`` at ``destination``, falling back to a copy if hard links are not supported.
+
+    An existing ``destination`` is overwritten, unless it already is a hard link to ``source``. The copy fallback is
+    only used if the link is refused because the paths are on different filesystems or linking is not permitted.
+
+    .. warning:: the content of a hard link is shared with the original file, so it should never be modified.
+    """
+    destination = pathlib.Path(destination)
+
+    if destination.exists():
+        if destination.samefile(source):
+            return destination
+        destination.unlink()
+
+    try:
+        os.link(source, destination)
+    except OSError as exception:
+        if exception.errno not in (errno.EXDEV, errno.EPERM):
+            raise
+        shutil.copy2(source, destination)
+
+    return destination